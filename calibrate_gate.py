@@ -0,0 +1,120 @@
+"""
+Kalibrasi ambang gating generasi per bahasa.
+Sebagian data pelatihan ditahan (held-out), retrieval dilatih pada sisanya, lalu dipilih ambang kemiripan
+terendah yang respons retrieval-nya masih benar dengan presisi >= GATE_TARGET_PRECISION.
+Hasil ditulis ke models/<LANG>/sklearn/gate.json dan dibaca ChatbotModels saat load().
+Jalankan ulang setelah pelatihan bila korpus berubah banyak.
+"""
+
+from __future__ import annotations
+import json
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import (
+    DATA_FILE,
+    MODELS_DIR,
+    MIN_SAMPLES_PER_LANG,
+    RANDOM_SEED,
+    GATE_HOLDOUT_FRACTION,
+    GATE_TARGET_PRECISION,
+    GATE_MIN_HOLDOUT,
+    GATE_MIN_GATED,
+)
+from corpus_cache import load_training_rows
+from model_loader import similarity_from_distance
+from train_model import group_by_lang, fit_retrieval_pipeline
+from utils import log_info, log_warn, timed
+
+
+def _split(lang: str, items: List[Dict]):
+    # RNG per bahasa agar split satu bahasa tidak bergantung pada bahasa lain yang dilewati
+    rng = np.random.RandomState((RANDOM_SEED + zlib.crc32(lang.encode("utf-8"))) % 2**32)
+    order = rng.permutation(len(items))
+    n_holdout = max(1, int(round(len(items) * GATE_HOLDOUT_FRACTION)))
+    held_out = [items[i] for i in order[:n_holdout]]
+    train = [items[i] for i in order[n_holdout:]]
+    return train, held_out
+
+
+def pick_threshold(scores: np.ndarray, correct: np.ndarray, target_precision: float) -> Optional[float]:
+    """
+    Ambang terendah t sehingga presisi retrieval pada semua sampel dengan skor >= t mencapai target.
+    None jika tidak ada ambang yang memenuhi.
+    """
+    order = np.argsort(-scores, kind="stable")
+    scores, correct = scores[order], correct[order]
+    precision = np.cumsum(correct) / np.arange(1, len(scores) + 1)
+    best: Optional[float] = None
+    for i in range(len(scores)):
+        # Ambang hanya bisa diletakkan di akhir kelompok skor yang sama
+        if i + 1 < len(scores) and scores[i + 1] == scores[i]:
+            continue
+        if precision[i] >= target_precision:
+            best = float(scores[i])
+    return best
+
+
+def calibrate_language(lang: str, items: List[Dict]) -> Optional[Dict]:
+    train, held_out = _split(lang, items)
+    if not train:
+        log_warn("Melewati kalibrasi - data latih kosong setelah split", lang=lang, samples=len(items))
+        return None
+
+    with timed(f"Calibrate gate for {lang}"):
+        pipe = fit_retrieval_pipeline(lang, [r["input"] for r in train])
+        responses = [r["response"] for r in train]
+        vec = pipe.named_steps["tfidf"].transform([r["input"] for r in held_out])
+        distances, indices = pipe.named_steps["knn"].kneighbors(vec, n_neighbors=1)
+
+    scores = similarity_from_distance(distances[:, 0])
+    correct = np.array([responses[i] == r["response"] for i, r in zip(indices[:, 0], held_out)])
+    threshold = pick_threshold(scores, correct, GATE_TARGET_PRECISION)
+    gated = scores >= threshold if threshold is not None else np.zeros(len(scores), dtype=bool)
+    if len(held_out) < GATE_MIN_HOLDOUT or gated.sum() < GATE_MIN_GATED:
+        log_warn(
+            "Sampel kalibrasi terlalu sedikit - gating dinonaktifkan",
+            lang=lang,
+            held_out=len(held_out),
+            gated=int(gated.sum()),
+        )
+        threshold = None
+        gated = np.zeros(len(scores), dtype=bool)
+    return {
+        "threshold": threshold,
+        "target_precision": GATE_TARGET_PRECISION,
+        "precision": float(correct[gated].mean()) if gated.any() else None,
+        "coverage": float(gated.mean()),
+        "held_out": len(held_out),
+        "train": len(train),
+    }
+
+
+def run_calibration(data_path: Path | None = None) -> Dict[str, Dict]:
+    data_path = data_path or DATA_FILE
+    rows = load_training_rows(data_path)
+    if not rows:
+        raise RuntimeError("No training data found.")
+
+    results: Dict[str, Dict] = {}
+    for lang, items in group_by_lang(rows).items():
+        if len(items) < MIN_SAMPLES_PER_LANG:
+            log_warn("Melewati kalibrasi - sampel tidak cukup", lang=lang, samples=len(items))
+            continue
+        result = calibrate_language(lang, items)
+        if result is None:
+            continue
+
+        out_dir = MODELS_DIR / lang / "sklearn"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / "gate.json").write_text(json.dumps(result, indent=2), encoding="utf-8")
+        log_info("Saved gate calibration", lang=lang, **result)
+        results[lang] = result
+    return results
+
+
+if __name__ == "__main__":
+    run_calibration()
\ No newline at end of file
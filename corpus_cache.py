@@ -0,0 +1,209 @@
+"""
+Cache korpus pelatihan yang sudah di-parse dan dinormalisasi.
+Baris (lang, input, response) disimpan kolumnar dalam .npz, dikunci oleh hash isi file dan PARSER_VERSION.
+File yang hanya ditambah baris di akhir cukup di-parse bagian ekornya saja.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import CORPUS_CACHE_DIR, CORPUS_CACHE_ENABLED
+from preprocessing import PARSER_VERSION, can_resume_after, parse_data_bytes, parse_data_file
+from utils import log_info, log_warn, timed
+
+_INDEX_FILE = "index.json"
+_TEXT_COLUMNS = ("input", "response")
+
+
+def _content_key(digest: str) -> str:
+    return f"{digest}-p{PARSER_VERSION}"
+
+
+def _current_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def _atomic_write(target: Path, write) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        # mkstemp membuat file 0600; samakan dengan artifacts lain (joblib.dump) yang mengikuti umask
+        os.chmod(tmp, 0o666 & ~_current_umask())
+        os.replace(tmp, target)
+    except Exception:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _encode_rows(rows: List[Dict]) -> Dict[str, np.ndarray]:
+    """Ubah baris menjadi kolom: kode bahasa uint8 + teks UTF-8 yang disambung dengan offset."""
+    langs = sorted({r["lang"] for r in rows})
+    lang_ids = {lang: i for i, lang in enumerate(langs)}
+    arrays: Dict[str, np.ndarray] = {
+        "lang_vocab": np.array(langs, dtype=str),
+        "lang": np.fromiter((lang_ids[r["lang"]] for r in rows), dtype=np.uint8, count=len(rows)),
+    }
+    for col in _TEXT_COLUMNS:
+        encoded = [r[col].encode("utf-8") for r in rows]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        arrays[f"{col}_data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        arrays[f"{col}_offsets"] = offsets
+    return arrays
+
+
+def _decode_rows(arrays) -> List[Dict]:
+    vocab = [str(v) for v in arrays["lang_vocab"]]
+    langs = [vocab[i] for i in arrays["lang"].tolist()]
+    columns = {}
+    for col in _TEXT_COLUMNS:
+        data = arrays[f"{col}_data"].tobytes()
+        offsets = arrays[f"{col}_offsets"].tolist()
+        columns[col] = [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(langs))]
+    return [
+        {"lang": lang, "input": text_in, "response": text_out}
+        for lang, text_in, text_out in zip(langs, columns["input"], columns["response"])
+    ]
+
+
+class CorpusCache:
+    """
+    Direktori cache berisi satu <sha256>-p<versi>.npz per isi korpus, ditambah index.json
+    yang mencatat entri terakhir per file sumber (ukuran, hash, apakah bisa dilanjutkan) untuk deteksi append.
+    """
+
+    def __init__(self, cache_dir: Path = CORPUS_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npz"
+
+    def _read_index(self) -> Dict[str, Dict]:
+        fp = self.cache_dir / _INDEX_FILE
+        if not fp.exists():
+            return {}
+        try:
+            return json.loads(fp.read_text(encoding="utf-8"))
+        except Exception as e:
+            log_warn("Index cache korpus rusak, diabaikan", error=str(e))
+            return {}
+
+    def _write_index(self, index: Dict[str, Dict]) -> None:
+        payload = json.dumps(index, ensure_ascii=False, indent=2).encode("utf-8")
+        _atomic_write(self.cache_dir / _INDEX_FILE, lambda f: f.write(payload))
+
+    def _load_entry(self, key: str) -> Optional[Tuple[str, List[Dict]]]:
+        fp = self.entry_path(key)
+        if not fp.exists():
+            return None
+        try:
+            with np.load(fp, allow_pickle=False) as arrays:
+                return str(arrays["format"]), _decode_rows(arrays)
+        except Exception as e:
+            log_warn("Entri cache korpus tidak terbaca, parse ulang", file=str(fp), error=str(e))
+            return None
+
+    def _store_entry(self, key: str, fmt: str, rows: List[Dict]) -> None:
+        arrays = _encode_rows(rows)
+        arrays["format"] = np.array(fmt)
+        _atomic_write(self.entry_path(key), lambda f: np.savez(f, **arrays))
+
+    def _parse_appended(self, data: bytes, prev: Optional[Dict]) -> Optional[Tuple[str, List[Dict], bool]]:
+        """
+        Parse hanya ekor baru jika `data` adalah isi sebelumnya ditambah baris di akhir.
+        Mengembalikan (format, rows, resumable); resumable cukup diperiksa pada ekornya saja.
+        """
+        if not prev or prev.get("parser_version") != PARSER_VERSION or not prev.get("resumable"):
+            return None
+        size = prev["size"]
+        if not (0 < size < len(data)):
+            return None
+        if hashlib.sha256(memoryview(data)[:size]).hexdigest() != prev["sha256"]:
+            return None
+        cached = self._load_entry(prev["key"])
+        if cached is None:
+            return None
+        fmt, base_rows = cached
+        if not base_rows:
+            # Prefix kosong bisa terdeteksi ulang ke format lain
+            return None
+        tail = data[size:]
+        try:
+            _, tail_rows = parse_data_bytes(tail, fmt=fmt)
+        except ValueError:
+            # Ekor mengubah hasil deteksi format (mis. baris JSONL rusak) → parse penuh
+            return None
+        log_info("Cache korpus: parse ekor yang ditambahkan", cached=len(base_rows), appended=len(tail_rows))
+        # Prefix sudah resumable (berakhir di batas record), jadi cukup periksa ekornya
+        return fmt, base_rows + tail_rows, can_resume_after(tail, fmt)
+
+    def load(self, path: Path) -> List[Dict]:
+        if not path.exists():
+            raise FileNotFoundError(f"File data tidak ditemukan: {path}")
+
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        key = _content_key(digest)
+        source = str(path.resolve())
+        index = self._read_index()
+        prev = index.get(source)
+
+        cached = self._load_entry(key)
+        resumable: Optional[bool] = None
+        if cached is not None:
+            log_info("Cache korpus hit", file=source, rows=len(cached[1]))
+            if prev and prev.get("key") == key:
+                return cached[1]
+            fmt, rows = cached
+        else:
+            appended = self._parse_appended(data, prev)
+            if appended is not None:
+                fmt, rows, resumable = appended
+            else:
+                with timed("Parse korpus penuh"):
+                    fmt, rows = parse_data_bytes(data)
+        if resumable is None:
+            resumable = can_resume_after(data, fmt)
+
+        try:
+            if cached is None:
+                self._store_entry(key, fmt, rows)
+            index[source] = {
+                "key": key,
+                "sha256": digest,
+                "size": len(data),
+                "parser_version": PARSER_VERSION,
+                "resumable": resumable,
+            }
+            self._write_index(index)
+            self._evict(prev, index)
+        except Exception as e:
+            log_warn("Gagal menulis cache korpus", dir=str(self.cache_dir), error=str(e))
+        return rows
+
+    def _evict(self, prev: Optional[Dict], index: Dict[str, Dict]) -> None:
+        # Hapus entri lama dari sumber ini bila tidak lagi dirujuk sumber lain
+        if not prev or any(v.get("key") == prev.get("key") for v in index.values()):
+            return
+        fp = self.entry_path(prev["key"])
+        if fp.exists():
+            fp.unlink()
+
+
+def load_training_rows(path: Path) -> List[Dict]:
+    """Baris pelatihan untuk `path`, lewat cache korpus kecuali CHATBOT_CORPUS_CACHE=0."""
+    if not CORPUS_CACHE_ENABLED:
+        return parse_data_file(path)
+    return CorpusCache().load(path)
\ No newline at end of file
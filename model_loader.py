@@ -1,16 +1,40 @@
 from __future__ import annotations
+import json
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
 
 from utils import log_info, log_warn, log_error
-from config import MODELS_DIR, SUPPORTED_LANGUAGES, MODEL_TYPE, RETRIEVAL_TOP_K, USE_TRANSFORMERS
+from config import (
+    MODELS_DIR,
+    SUPPORTED_LANGUAGES,
+    MODEL_TYPE,
+    RETRIEVAL_TOP_K,
+    USE_TRANSFORMERS,
+    GATE_DEFAULT_THRESHOLD,
+    GATE_THRESHOLDS,
+)
+
+GATE_OUTCOMES = ("gated", "generated", "generation_failed")
+
+
+def similarity_from_distance(distance):
+    """
+    Jarak kNN cosinus → kemiripan di [0, 1]; skalar atau array.
+    Dipakai saat serving dan kalibrasi agar ambang dan skor dihitung identik.
+    Dibulatkan agar galat float tidak membuat kecocokan persis menjadi 0.9999999999999999.
+    """
+    return np.clip(np.round(1.0 - np.asarray(distance, dtype=float), 12), 0.0, 1.0)
 
 
 @dataclass
 class RetrievalModel:
     pipeline: Any  # Pipeline sklearn
     responses: List[str]  # respons pelatihan yang diselaraskan
+    gate_threshold: Optional[float] = None  # dari gate.json hasil kalibrasi; inf = jangan pernah gate
 
 
 class ChatbotModels:
@@ -18,6 +42,8 @@ class ChatbotModels:
         self.type = MODEL_TYPE
         self.retrieval: Dict[str, RetrievalModel] = {}
         self.generators: Dict[str, Any] = {}  # pipeline transformers per bahasa, opsional
+        self._gate_lock = threading.Lock()
+        self.gate_stats: Dict[str, Dict[str, int]] = {}
 
     def model_path(self, lang: str) -> Path:
         return MODELS_DIR / lang
@@ -41,13 +67,56 @@ class ChatbotModels:
                 try:
                     pipeline = joblib.load(pipe_fp)
                     responses = joblib.load(resp_fp)
-                    self.retrieval[lang] = RetrievalModel(pipeline=pipeline, responses=responses)
-                    log_info("Loaded sklearn model", lang=lang, items=len(responses))
+                    gate_threshold = self._load_gate_threshold(lang_dir / "gate.json")
+                    self.retrieval[lang] = RetrievalModel(
+                        pipeline=pipeline, responses=responses, gate_threshold=gate_threshold
+                    )
+                    log_info("Loaded sklearn model", lang=lang, items=len(responses), gate_threshold=gate_threshold)
                 except Exception as e:
                     log_warn("Failed to load sklearn model", lang=lang, error=str(e))
             else:
                 log_warn("Sklearn artifacts missing", lang=lang, dir=str(lang_dir))
 
+    def _load_gate_threshold(self, fp: Path) -> Optional[float]:
+        if not fp.exists():
+            return None
+        try:
+            threshold = json.loads(fp.read_text(encoding="utf-8")).get("threshold")
+            # null berarti kalibrasi tidak menemukan ambang yang aman → selalu generate
+            return float("inf") if threshold is None else float(threshold)
+        except Exception as e:
+            log_warn("Failed to load gate calibration", file=str(fp), error=str(e))
+            return None
+
+    def gate_threshold(self, lang: str) -> float:
+        if lang in GATE_THRESHOLDS:
+            return GATE_THRESHOLDS[lang]
+        model = self.retrieval.get(lang)
+        if model and model.gate_threshold is not None:
+            return model.gate_threshold
+        return GATE_DEFAULT_THRESHOLD
+
+    def _record_gate(self, lang: str, outcome: str):
+        with self._gate_lock:
+            counts = self.gate_stats.setdefault(lang, {k: 0 for k in GATE_OUTCOMES})
+            counts[outcome] += 1
+
+    def gate_report(self) -> Dict[str, Dict[str, Any]]:
+        """Pembagian permintaan gated vs generated per bahasa (hanya bahasa dengan generator)."""
+        with self._gate_lock:
+            stats = {lang: dict(counts) for lang, counts in self.gate_stats.items()}
+        report = {}
+        for lang, counts in stats.items():
+            total = sum(counts.values())
+            threshold = self.gate_threshold(lang)
+            report[lang] = {
+                **counts,
+                "total": total,
+                "gated_ratio": counts["gated"] / total if total else 0.0,
+                "threshold": None if threshold == float("inf") else threshold,
+            }
+        return report
+
     def _load_transformers(self):
         from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline as hf_pipeline
         from config import HF_MODEL_NAME
@@ -68,50 +137,66 @@ class ChatbotModels:
 
     def infer(self, lang: str, text: str, tone: str = "neutral") -> str:
         """
+        - Jika kemiripan retrieval >= ambang gate bahasa → langsung pakai respons retrieval
         - Jika generator transformers ada → hasilkan respons (opsional seed dengan exemplar yang diambil)
         - Jika tidak gunakan respons kecocokan terbaik retrieval
         """
         text = text.strip()
         # Retrieval sebagai dasar
-        base_resp = self._retrieve(lang, text)
+        base_resp, score = self.retrieve(lang, text)
 
         # Jika generator tersedia, opsional kondisikan dengan base_resp
         if lang in self.generators:
+            # score None = retrieval gagal atau memakai model bahasa lain → jangan pernah gate
+            if score is not None and score >= self.gate_threshold(lang):
+                self._record_gate(lang, "gated")
+                return base_resp
+
             prompt = f"User: {text}\nContext: {base_resp}\nTone: {tone}\nAssistant:"
             try:
                 out = self.generators[lang](prompt, max_new_tokens=128, num_return_sequences=1)
                 gen_text = out[0]["generated_text"]
+                self._record_gate(lang, "generated")
                 return gen_text.strip()
             except Exception as e:
+                self._record_gate(lang, "generation_failed")
                 log_warn("Generation failed, falling back to retrieval", lang=lang, error=str(e))
 
         # Fallback
         return base_resp
 
-    def _retrieve(self, lang: str, text: str) -> str:
+    def retrieve(self, lang: str, text: str) -> Tuple[str, Optional[float]]:
+        """
+        Respons kecocokan terbaik dan skor kemiripan cosinusnya (0..1).
+        Skor None bila retrieval gagal atau jawaban berasal dari model bahasa lain.
+        """
         model = self.retrieval.get(lang)
+        same_lang = model is not None
         if not model:
             # fallback ke bahasa lain yang tersedia
             for m in self.retrieval.values():
                 model = m
                 break
         if not model:
-            return "Maaf, model belum dimuat."
+            return "Maaf, model belum dimuat.", None
 
         try:
-            vec = model.pipeline.transform([text])
+            # Langkah terakhir adalah NearestNeighbors (tanpa transform) → vektorkan dengan langkah sebelumnya
+            vec = model.pipeline[:-1].transform([text])
             # Gunakan kneighbors dari NearestNeighbors jika tersedia di dalam pipeline
             # Jika tidak, gunakan dot-product kesamaan cosinus
             knn = getattr(model.pipeline[-1], "kneighbors", None)
             if callable(knn):
                 distances, indices = knn(vec, n_neighbors=min(RETRIEVAL_TOP_K, len(model.responses)))
                 idx = indices[0][0]
-                return model.responses[idx]
+                # metric="cosine" → jarak = 1 - kemiripan cosinus
+                score = float(similarity_from_distance(distances[0][0]))
+                return model.responses[idx], score if same_lang else None
             else:
                 # kesamaan cosinus
                 sim = model.pipeline[-1].transform(vec)  # jalur yang tidak mungkin; simpan untuk kompatibilitas
                 idx = 0
-                return model.responses[idx]
+                return model.responses[idx], None
         except Exception as e:
             log_warn("Retrieval failed", error=str(e))
-            return "Saya kesulitan mengambil jawaban saat ini."
\ No newline at end of file
+            return "Saya kesulitan mengambil jawaban saat ini.", None
\ No newline at end of file
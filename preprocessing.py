@@ -4,6 +4,7 @@ Mendukung format input fleksibel dan normalisasi yang sadar bahasa.
 """
 
 from __future__ import annotations
+import io
 import re
 import unicodedata
 from typing import List, Dict, Tuple, Iterable, Optional
@@ -51,6 +52,126 @@ def detect_lang_heuristic(text: str) -> str:
     return "EN"
 
 
+# Naikkan setiap kali aturan parsing/normalisasi berubah agar cache korpus lama tidak dipakai ulang.
+PARSER_VERSION = 1
+
+DATA_FORMATS = ("jsonl", "tsv", "csv")
+
+
+def _make_row(lang: str, text_in: str, text_out: str) -> Dict:
+    return {
+        "lang": lang if lang in SUPPORTED_LANGUAGES else detect_lang_heuristic(text_in),
+        "input": normalize_text(text_in),
+        "response": normalize_text(text_out),
+    }
+
+
+def _parse_jsonl(lines: Iterable[str]) -> Optional[List[Dict]]:
+    import json
+
+    rows: List[Dict] = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+            lang = obj.get("lang") or obj.get("language")
+            text_in = obj.get("input") or obj.get("prompt") or obj.get("question")
+            text_out = obj.get("response") or obj.get("answer")
+            if not text_in or not text_out:
+                raise ValueError("Input/response hilang")
+            lang = (lang or detect_lang_heuristic(text_in)).upper()
+            rows.append(_make_row(lang, text_in, text_out))
+        except Exception:
+            return None
+    return rows
+
+
+def _parse_tsv(lines: Iterable[str]) -> Optional[List[Dict]]:
+    rows: List[Dict] = []
+    try:
+        for line in lines:
+            parts = [p.strip() for p in line.strip().split("\t")]
+            if len(parts) < 2:
+                return None
+            if len(parts) == 2:
+                lang = detect_lang_heuristic(parts[0])
+                text_in, text_out = parts[0], parts[1]
+            else:
+                lang, text_in, text_out = parts[0].upper(), parts[1], parts[2]
+            rows.append(_make_row(lang, text_in, text_out))
+    except Exception:
+        return None
+    return rows
+
+
+def _parse_csv(lines: Iterable[str]) -> Optional[List[Dict]]:
+    import csv
+
+    rows: List[Dict] = []
+    for parts in csv.reader(lines):
+        if not parts:
+            continue
+        if len(parts) >= 3:
+            lang, text_in, text_out = parts[0].strip().upper(), parts[1], parts[2]
+        elif len(parts) == 2:
+            text_in, text_out = parts[0], parts[1]
+            lang = detect_lang_heuristic(text_in)
+        else:
+            continue
+        rows.append(_make_row(lang, text_in, text_out))
+    return rows
+
+
+_FORMAT_PARSERS = {"jsonl": _parse_jsonl, "tsv": _parse_tsv, "csv": _parse_csv}
+
+
+def _text_lines(data: bytes) -> List[str]:
+    # Pemisahan baris yang sama dengan path.open("r", encoding="utf-8")
+    return list(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8"))
+
+
+def can_resume_after(data: bytes, fmt: str) -> bool:
+    """
+    True jika baris yang ditambahkan setelah `data` dapat di-parse terpisah dengan format `fmt`:
+    isi berakhir di batas baris dan, untuk CSV, tidak berakhir di dalam field yang dikutip.
+    """
+    if not data.endswith(b"\n"):
+        return False
+    if fmt != "csv":
+        return True
+    import csv
+
+    try:
+        # strict=True gagal pada kutipan yang masih terbuka di akhir data
+        for _ in csv.reader(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8"), strict=True):
+            pass
+    except csv.Error:
+        return False
+    return True
+
+
+def parse_data_bytes(data: bytes, fmt: Optional[str] = None) -> Tuple[str, List[Dict]]:
+    """
+    Parse isi dataset mentah dan kembalikan (format, rows).
+    Tanpa `fmt`, format dideteksi berurutan JSONL → TSV → CSV seperti parse_data_file.
+    Dengan `fmt`, hanya format itu yang dicoba; ValueError jika isinya tidak cocok.
+    """
+    lines = _text_lines(data)
+    if fmt is not None:
+        rows = _FORMAT_PARSERS[fmt](lines)
+        if rows is None:
+            raise ValueError(f"Data tidak cocok dengan format {fmt}")
+        return fmt, rows
+
+    for name in ("jsonl", "tsv"):
+        rows = _FORMAT_PARSERS[name](lines)
+        if rows:
+            return name, rows
+    return "csv", _parse_csv(lines)
+
+
 def parse_data_file(path: Path) -> List[Dict]:
     """
     Terima format fleksibel:
@@ -62,89 +183,8 @@ def parse_data_file(path: Path) -> List[Dict]:
     if not path.exists():
         raise FileNotFoundError(f"File data tidak ditemukan: {path}")
 
-    rows: List[Dict] = []
-    # Coba JSONL terlebih dahulu
-    try:
-        import json
-        with path.open("r", encoding="utf-8") as f:
-            is_jsonl = True
-            for i, line in enumerate(f, 1):
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                    lang = obj.get("lang") or obj.get("language")
-                    text_in = obj.get("input") or obj.get("prompt") or obj.get("question")
-                    text_out = obj.get("response") or obj.get("answer")
-                    if not text_in or not text_out:
-                        raise ValueError("Input/response hilang")
-                    lang = (lang or detect_lang_heuristic(text_in)).upper()
-                    rows.append(
-                        {
-                            "lang": lang if lang in SUPPORTED_LANGUAGES else detect_lang_heuristic(text_in),
-                            "input": normalize_text(text_in),
-                            "response": normalize_text(text_out),
-                        }
-                    )
-                except Exception:
-                    is_jsonl = False
-                    break
-        if is_jsonl and rows:
-            return rows
-        rows.clear()
-    except Exception:
-        rows.clear()
-
-    # Coba TSV
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            tsv_like = True
-            for i, line in enumerate(f, 1):
-                parts = [p.strip() for p in line.strip().split("\t")]
-                if len(parts) < 2:
-                    tsv_like = False
-                    break
-                if len(parts) == 2:
-                    lang = detect_lang_heuristic(parts[0])
-                    text_in, text_out = parts[0], parts[1]
-                else:
-                    lang, text_in, text_out = parts[0].upper(), parts[1], parts[2]
-                rows.append(
-                    {
-                        "lang": lang if lang in SUPPORTED_LANGUAGES else detect_lang_heuristic(text_in),
-                        "input": normalize_text(text_in),
-                        "response": normalize_text(text_out),
-                    }
-                )
-        if tsv_like and rows:
-            return rows
-        rows.clear()
-    except Exception:
-        rows.clear()
-
-    # Fallback: CSV
     try:
-        import csv
-        with path.open("r", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            for i, parts in enumerate(reader, 1):
-                if not parts:
-                    continue
-                if len(parts) >= 3:
-                    lang, text_in, text_out = parts[0].strip().upper(), parts[1], parts[2]
-                elif len(parts) == 2:
-                    text_in, text_out = parts[0], parts[1]
-                    lang = detect_lang_heuristic(text_in)
-                else:
-                    continue
-                rows.append(
-                    {
-                        "lang": lang if lang in SUPPORTED_LANGUAGES else detect_lang_heuristic(text_in),
-                        "input": normalize_text(text_in),
-                        "response": normalize_text(text_out),
-                    }
-                )
+        _, rows = parse_data_bytes(path.read_bytes())
         return rows
     except Exception as e:
         log_error("Gagal mem-parse dataset", error=str(e))
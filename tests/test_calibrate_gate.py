@@ -0,0 +1,71 @@
+import json
+
+import numpy as np
+
+import calibrate_gate
+import corpus_cache
+from calibrate_gate import calibrate_language, pick_threshold, run_calibration
+
+_TOPICS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"]
+
+
+def _rows(n):
+    return [
+        {"lang": "EN", "input": f"tell me about {_TOPICS[i % 10]}", "response": f"answer {_TOPICS[i % 10]}"}
+        for i in range(n)
+    ]
+
+
+def test_pick_threshold_only_between_tied_groups():
+    scores = np.array([1.0, 0.9, 0.9, 0.5, 0.3])
+    correct = np.array([True, True, False, True, False])
+    assert pick_threshold(scores, correct, 1.0) == 1.0
+    # 0.9 sendirian 2/3 < 0.75; ikut 0.5 menjadi 3/4
+    assert pick_threshold(scores, correct, 0.75) == 0.5
+    assert pick_threshold(scores, correct, 0.6) == 0.3
+
+
+def test_pick_threshold_none_when_nothing_qualifies():
+    assert pick_threshold(np.array([0.8, 0.2]), np.array([False, False]), 0.9) is None
+    assert pick_threshold(np.array([0.9, 0.9]), np.array([True, False]), 0.95) is None
+
+
+def test_calibrate_language_thresholds(monkeypatch):
+    monkeypatch.setattr(calibrate_gate, "GATE_MIN_HOLDOUT", 5)
+    monkeypatch.setattr(calibrate_gate, "GATE_MIN_GATED", 3)
+    result = calibrate_language("EN", _rows(40))
+    assert result["held_out"] == 8
+    assert result["threshold"] == 1.0
+    assert result["precision"] == 1.0
+
+
+def test_calibrate_language_null_when_too_few_held_out(monkeypatch):
+    monkeypatch.setattr(calibrate_gate, "GATE_MIN_HOLDOUT", 9)
+    monkeypatch.setattr(calibrate_gate, "GATE_MIN_GATED", 3)
+    result = calibrate_language("EN", _rows(40))
+    assert result["threshold"] is None
+    assert result["coverage"] == 0.0
+
+
+def test_calibrate_language_null_when_too_few_gated(monkeypatch):
+    monkeypatch.setattr(calibrate_gate, "GATE_MIN_HOLDOUT", 5)
+    monkeypatch.setattr(calibrate_gate, "GATE_MIN_GATED", 9)
+    assert calibrate_language("EN", _rows(40))["threshold"] is None
+
+
+def test_run_calibration_writes_null_threshold(tmp_path, monkeypatch):
+    data_fp = tmp_path / "data.txt"
+    data_fp.write_text("".join(json.dumps(r) + "\n" for r in _rows(40)), encoding="utf-8")
+    monkeypatch.setattr(corpus_cache, "CORPUS_CACHE_ENABLED", False)
+    monkeypatch.setattr(calibrate_gate, "MODELS_DIR", tmp_path / "models")
+
+    run_calibration(data_fp)
+    gate = json.loads((tmp_path / "models" / "EN" / "sklearn" / "gate.json").read_text(encoding="utf-8"))
+    assert gate["threshold"] is None
+    assert gate["held_out"] == 8
+
+
+def test_split_does_not_depend_on_other_languages():
+    rows = _rows(40)
+    assert calibrate_gate._split("EN", rows) == calibrate_gate._split("EN", rows)
+    assert calibrate_gate._split("EN", rows) != calibrate_gate._split("JP", rows)
\ No newline at end of file
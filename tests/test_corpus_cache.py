@@ -0,0 +1,79 @@
+import os
+import stat
+
+import corpus_cache
+from corpus_cache import CorpusCache
+from preprocessing import parse_data_file
+
+
+def _load_after_each_append(tmp_path, chunks):
+    data_fp = tmp_path / "data.txt"
+    data_fp.write_bytes(b"")
+    cache = CorpusCache(tmp_path / "cache")
+    for chunk in chunks:
+        with data_fp.open("ab") as f:
+            f.write(chunk.encode("utf-8"))
+        assert cache.load(data_fp) == parse_data_file(data_fp)
+    # Muat ulang dari cache (hit) harus tetap sama
+    assert cache.load(data_fp) == parse_data_file(data_fp)
+
+
+def test_csv_append_across_open_quote(tmp_path):
+    _load_after_each_append(
+        tmp_path,
+        [
+            'EN,"a, b",c\n',
+            'EN,"multi\nline",z\n',
+            'EN,x"y,z\n',
+            'EN,"open\n',
+            'close",zz\n',
+        ],
+    )
+
+
+def test_jsonl_append_and_format_change(tmp_path):
+    _load_after_each_append(
+        tmp_path,
+        [
+            '{"lang":"EN","input":"hi  there","response":"hello"}\n',
+            '{"lang":"JP","input":"こんにちは","response":"はい"}\n',
+            "not json\n",
+        ],
+    )
+
+
+def test_tsv_append(tmp_path):
+    _load_after_each_append(tmp_path, ["EN\thi\tyo\n", "JP\tこんにちは\tはい\n", "ID\tapa itu\tya\n"])
+
+
+def test_cache_files_follow_umask(tmp_path):
+    data_fp = tmp_path / "data.txt"
+    data_fp.write_text("EN\thi\tyo\n", encoding="utf-8")
+    old = os.umask(0o022)
+    try:
+        CorpusCache(tmp_path / "cache").load(data_fp)
+    finally:
+        os.umask(old)
+    for fp in (tmp_path / "cache").iterdir():
+        assert stat.S_IMODE(fp.stat().st_mode) == 0o644, fp
+
+
+def test_append_checks_resumability_of_tail_only(tmp_path, monkeypatch):
+    data_fp = tmp_path / "data.txt"
+    head = 'EN,"a, b",c\nEN,x"y,z\n'
+    data_fp.write_text(head, encoding="utf-8")
+    cache = CorpusCache(tmp_path / "cache")
+    cache.load(data_fp)
+
+    checked = []
+    real = corpus_cache.can_resume_after
+
+    def spy(data, fmt):
+        checked.append(data)
+        return real(data, fmt)
+
+    monkeypatch.setattr(corpus_cache, "can_resume_after", spy)
+    with data_fp.open("a", encoding="utf-8") as f:
+        f.write('EN,"multi\nline",z\n')
+    assert cache.load(data_fp) == parse_data_file(data_fp)
+    assert checked == [b'EN,"multi\nline",z\n']
\ No newline at end of file
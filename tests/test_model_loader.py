@@ -0,0 +1,93 @@
+import pytest
+
+import model_loader
+from model_loader import ChatbotModels, RetrievalModel, similarity_from_distance
+from train_model import fit_retrieval_pipeline
+
+_INPUTS = ["hello there", "how are you", "what is this"]
+_RESPONSES = ["hi", "fine", "a test"]
+
+
+class _Generator:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def __call__(self, prompt, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("boom")
+        return [{"generated_text": " generated "}]
+
+
+class _BrokenPipeline:
+    def __getitem__(self, item):
+        return self
+
+    def transform(self, X):
+        raise ValueError("broken")
+
+
+@pytest.fixture
+def models(monkeypatch):
+    monkeypatch.setattr(model_loader, "GATE_THRESHOLDS", {})
+    m = ChatbotModels()
+    m.retrieval["EN"] = RetrievalModel(pipeline=fit_retrieval_pipeline("EN", _INPUTS), responses=_RESPONSES)
+    return m
+
+
+def test_similarity_from_distance_clipped():
+    assert similarity_from_distance(1.1102230246251565e-16) == 1.0
+    assert similarity_from_distance(-1e-15) == 1.0
+    assert list(similarity_from_distance([0.25, 1.5])) == [0.75, 0.0]
+
+
+def test_retrieve_scores_same_language(models):
+    assert models.retrieve("EN", "how are you") == ("fine", 1.0)
+
+
+def test_retrieve_score_none_without_model():
+    resp, score = ChatbotModels().retrieve("EN", "how are you")
+    assert score is None
+
+
+def test_retrieve_score_none_when_retrieval_raises(models):
+    models.retrieval["EN"] = RetrievalModel(pipeline=_BrokenPipeline(), responses=_RESPONSES)
+    resp, score = models.retrieve("EN", "how are you")
+    assert score is None
+
+
+def test_retrieve_score_none_for_other_language_model(models):
+    resp, score = models.retrieve("JP", "how are you")
+    assert resp == "fine"
+    assert score is None
+
+
+def test_infer_gate_counts(models):
+    models.retrieval["EN"].gate_threshold = 0.9
+    models.generators["EN"] = _Generator()
+    assert models.infer("EN", "how are you") == "fine"
+    assert models.infer("EN", "how are you") == "fine"
+    assert models.infer("EN", "completely unrelated") == "generated"
+    assert models.generators["EN"].calls == 1
+
+    models.generators["EN"] = _Generator(fail=True)
+    assert models.infer("EN", "completely unrelated") in _RESPONSES
+
+    report = models.gate_report()["EN"]
+    assert (report["gated"], report["generated"], report["generation_failed"]) == (2, 1, 1)
+    assert report["total"] == 4
+    assert report["gated_ratio"] == 0.5
+    assert report["threshold"] == 0.9
+
+
+def test_infer_never_gates_fallback_or_failure(models):
+    # Ambang 0.0 akan meloloskan skor apa pun; fallback/gagal tetap harus ke generator
+    models.retrieval["EN"].gate_threshold = 0.0
+    models.generators["JP"] = _Generator()
+    assert models.infer("JP", "how are you") == "generated"
+    models.retrieval["EN"] = RetrievalModel(pipeline=_BrokenPipeline(), responses=_RESPONSES, gate_threshold=0.0)
+    models.generators["EN"] = _Generator()
+    assert models.infer("EN", "how are you") == "generated"
+    assert models.gate_report()["JP"]["gated"] == 0
+    assert models.gate_report()["EN"]["gated"] == 0
\ No newline at end of file
@@ -0,0 +1,15 @@
+import train_model
+from train_model import train_sklearn_per_language
+
+
+def test_retraining_removes_stale_gate_calibration(tmp_path, monkeypatch):
+    monkeypatch.setattr(train_model, "MODELS_DIR", tmp_path)
+    gate_fp = tmp_path / "EN" / "sklearn" / "gate.json"
+    gate_fp.parent.mkdir(parents=True)
+    gate_fp.write_text('{"threshold": 0.5}', encoding="utf-8")
+
+    rows = [{"lang": "EN", "input": f"question {w}", "response": w} for w in "abcdefghijkl"]
+    train_sklearn_per_language(rows)
+
+    assert (tmp_path / "EN" / "sklearn" / "pipeline.joblib").exists()
+    assert not gate_fp.exists()
\ No newline at end of file
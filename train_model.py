@@ -18,7 +18,7 @@ from config import (
     USE_TRANSFORMERS,
     RANDOM_SEED,
 )
-from preprocessing import parse_data_file
+from corpus_cache import load_training_rows
 from utils import log_info, log_warn, log_error, timed
 
 
@@ -40,14 +40,30 @@ def _build_vectorizer(lang: str) -> TfidfVectorizer:
         )
 
 
-def train_sklearn_per_language(rows: List[Dict]):
-    MODELS_DIR.mkdir(parents=True, exist_ok=True)
-    # Kelompokkan berdasarkan bahasa
+def group_by_lang(rows: List[Dict]) -> Dict[str, List[Dict]]:
     by_lang: Dict[str, List[Dict]] = {lang: [] for lang in SUPPORTED_LANGUAGES}
     for r in rows:
         lang = r["lang"].upper()
         if lang in by_lang:
             by_lang[lang].append(r)
+    return by_lang
+
+
+def fit_retrieval_pipeline(lang: str, X: List[str]) -> Pipeline:
+    vectorizer = _build_vectorizer(lang)
+    knn = NearestNeighbors(n_neighbors=5, metric="cosine")
+    pipe = Pipeline([("tfidf", vectorizer), ("knn", knn)])
+    # Fit TF-IDF
+    pipe.named_steps["tfidf"].fit(X)
+    X_mat = pipe.named_steps["tfidf"].transform(X)
+    pipe.named_steps["knn"].fit(X_mat)
+    return pipe
+
+
+def train_sklearn_per_language(rows: List[Dict]):
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    # Kelompokkan berdasarkan bahasa
+    by_lang = group_by_lang(rows)
 
     for lang, items in by_lang.items():
         if len(items) < MIN_SAMPLES_PER_LANG:
@@ -58,19 +74,15 @@ def train_sklearn_per_language(rows: List[Dict]):
         y = [r["response"] for r in items]
 
         with timed(f"Train sklearn model for {lang}"):
-            vectorizer = _build_vectorizer(lang)
-            knn = NearestNeighbors(n_neighbors=5, metric="cosine")
-            pipe = Pipeline([("tfidf", vectorizer), ("knn", knn)])
-            # Fit TF-IDF
-            pipe.named_steps["tfidf"].fit(X)
-            X_mat = pipe.named_steps["tfidf"].transform(X)
-            pipe.named_steps["knn"].fit(X_mat)
+            pipe = fit_retrieval_pipeline(lang, X)
 
         # Simpan artifacts
         out_dir = MODELS_DIR / lang / "sklearn"
         out_dir.mkdir(parents=True, exist_ok=True)
         joblib.dump(pipe, out_dir / "pipeline.joblib")
         joblib.dump(y, out_dir / "responses.joblib")
+        # Ambang gate dikalibrasi untuk pipeline lama; jalankan calibrate_gate.py lagi
+        (out_dir / "gate.json").unlink(missing_ok=True)
         log_info("Saved sklearn artifacts", lang=lang, dir=str(out_dir))
 
 
@@ -105,11 +117,7 @@ def train_transformers_per_language(rows: List[Dict]):
     tokenizer = AutoTokenizer.from_pretrained(HF_MODEL_NAME)
 
     # Kelompokkan baris berdasarkan bahasa
-    by_lang: Dict[str, List[Dict]] = {lang: [] for lang in SUPPORTED_LANGUAGES}
-    for r in rows:
-        lang = r["lang"].upper()
-        if lang in by_lang:
-            by_lang[lang].append(r)
+    by_lang = group_by_lang(rows)
 
     for lang, items in by_lang.items():
         if len(items) < MIN_SAMPLES_PER_LANG:
@@ -176,7 +184,7 @@ def train_transformers_per_language(rows: List[Dict]):
 
 def run_training(data_path: Path | None = None):
     data_path = data_path or DATA_FILE
-    rows = parse_data_file(data_path)
+    rows = load_training_rows(data_path)
     log_info("Loaded training rows", total=len(rows))
     if not rows:
         raise RuntimeError("No training data found.")
@@ -36,6 +36,11 @@ def on_startup():
 def health():
     return {"status": "ok"}
 
+@app.get("/stats/gate")
+def gate_stats():
+    """Jumlah permintaan yang di-gate (retrieval saja) vs di-generate per bahasa sejak startup."""
+    return models.gate_report()
+
 @app.post("/chat", response_model=ChatResponse)
 def chat(req: ChatRequest):
     session = SessionLocal()